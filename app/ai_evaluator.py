@@ -6,6 +6,7 @@ Provides initial code analysis and feedback before unit test evaluation
 import requests
 import json
 import re
+import time
 from typing import Tuple, Dict, Any, Optional
 
 
@@ -16,6 +17,10 @@ class AIEvaluator:
         self.lm_studio_url = "http://localhost:1234/v1/chat/completions"
         self.model_path = r"C:\Users\Zyb\.lmstudio\models\bartowski\DeepSeek-Coder-V2-Lite-Instruct-GGUF\DeepSeek-Coder-V2-Lite-Instruct-Q8_0_L.gguf"
         self.timeout = 30  # 30 seconds timeout for AI evaluation
+        # Last LM Studio probe, reused for a few seconds so bursts of evaluations skip the HTTP round-trip
+        self.availability_ttl = 5.0
+        self._ai_check_time = 0.0
+        self._ai_check_result = False
     
     def evaluate_code(self, code: str, problem_statement: str, language: str, unit_tests: str = "") -> Tuple[bool, int, str]:
         """
@@ -53,12 +58,18 @@ class AIEvaluator:
             return False, 0, f"AI evaluation error: {str(e)}"
     
     def _check_lm_studio_available(self) -> bool:
-        """Check if LM Studio is running and accessible"""
+        """Check if LM Studio is running and accessible (cached for availability_ttl seconds)"""
+        now = time.monotonic()
+        if self._ai_check_time and now - self._ai_check_time < self.availability_ttl:
+            return self._ai_check_result
         try:
             response = requests.get("http://localhost:1234/v1/models", timeout=5)
-            return response.status_code == 200
+            available = response.status_code == 200
         except:
-            return False
+            available = False
+        self._ai_check_time = time.monotonic()
+        self._ai_check_result = available
+        return available
     
     def _create_evaluation_prompt(self, code: str, problem_statement: str, language: str, unit_tests: str) -> str:
         """Create a concise prompt for AI code evaluation"""
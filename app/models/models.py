@@ -1,6 +1,41 @@
 from app import db
 from datetime import datetime
+import functools
 import json
+import os
+
+from sqlalchemy.orm import deferred
+from app.utils.file_utils import file_key
+
+# JSON text columns go through orjson when it is installed; both paths read and write plain JSON text
+try:
+    import orjson
+
+    def _json_text(obj):
+        return orjson.dumps(obj).decode('utf-8')
+    _json_parse = orjson.loads
+except ImportError:
+    _json_text = json.dumps
+    _json_parse = json.loads
+
+
+@functools.lru_cache(maxsize=32)
+def _csv_head(key, limit):
+    """First rows of a dataset CSV as records; keyed by file_key so edited or replaced files are re-read"""
+    import pandas as pd
+    return tuple(pd.read_csv(key[0], nrows=limit).to_dict('records'))
+
+class _JsonColumnCache:
+    """Mixin for models that keep lists in JSON text columns"""
+
+    def _parsed_json(self, column):
+        """Parsed value of a JSON text column, reused until the column's value changes"""
+        raw = getattr(self, column)
+        cache = self.__dict__.setdefault('_json_cache', {})
+        hit = cache.get(column)
+        if hit is None or hit[0] != raw:
+            hit = cache[column] = (raw, _json_parse(raw))
+        return hit[1]
 
 class Form(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -14,15 +49,20 @@ class Form(db.Model):
     def __repr__(self):
         return f"Form('{self.title}')"
 
-class Question(db.Model):
+class Question(_JsonColumnCache, db.Model):
+    # Forms load their questions by form_id, ordered by order
+    __table_args__ = (db.Index('ix_question_form_order', 'form_id', 'order'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     form_id = db.Column(db.Integer, db.ForeignKey('form.id'), nullable=False)
     question_text = db.Column(db.Text, nullable=False)
     question_type = db.Column(db.String(20), nullable=False)  # 'multiple_choice', 'identification', 'coding'
-    options = db.Column(db.Text, nullable=True)  # JSON string for multiple choice options
-    sample_code = db.Column(db.Text, nullable=True)  # For coding questions
-    expected_output = db.Column(db.Text, nullable=True)  # For coding questions
-    correct_answer = db.Column(db.Text, nullable=True)  # For correct answer in multiple choice and identification
+    # Bulky answer-key columns load lazily as one group; pages that render or
+    # grade questions ask for them with undefer_group('content')
+    options = deferred(db.Column(db.Text, nullable=True), group='content')  # JSON string for multiple choice options
+    sample_code = deferred(db.Column(db.Text, nullable=True), group='content')  # For coding questions
+    expected_output = deferred(db.Column(db.Text, nullable=True), group='content')  # For coding questions
+    correct_answer = deferred(db.Column(db.Text, nullable=True), group='content')  # For correct answer in multiple choice and identification
     order = db.Column(db.Integer, default=0)
     points = db.Column(db.Integer, default=1)  # Points value for the question
     category = db.Column(db.String(100), nullable=True)
@@ -35,14 +75,15 @@ class Question(db.Model):
     
     def get_options(self):
         if self.options and self.question_type in ['multiple_choice', 'checkbox']:
-            return json.loads(self.options)
+            # Templates call this for every option row; copy so callers can't alter the cached list
+            return list(self._parsed_json('options'))
         if self.question_type == 'true_false':
             return ['True', 'False']
         return []
     
     def set_options(self, options_list):
         if self.question_type in ['multiple_choice', 'checkbox']:
-            self.options = json.dumps(options_list)
+            self.options = _json_text(options_list)
     
     def get_correct_answers(self):
         """Return list of correct answers for checkbox/enumeration, or single-item list for others."""
@@ -50,8 +91,8 @@ class Question(db.Model):
             return []
         if self.question_type in ['checkbox', 'enumeration']:
             try:
-                data = json.loads(self.correct_answer)
-                return data if isinstance(data, list) else []
+                data = self._parsed_json('correct_answer')
+                return list(data) if isinstance(data, list) else []
             except Exception:
                 return []
         return [self.correct_answer]
@@ -61,12 +102,16 @@ class Response(db.Model):
     form_id = db.Column(db.Integer, db.ForeignKey('form.id'), nullable=False)
     submitted_by = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Lazy so existence checks stay one query; list views that walk answers ask for selectinload(Response.answers)
     answers = db.relationship('Answer', backref='response', lazy=True, cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"Response('{self.id}')"
 
 class Answer(db.Model):
+    # Grading and response views look answers up by response, then question
+    __table_args__ = (db.Index('ix_answer_response_question', 'response_id', 'question_id'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     response_id = db.Column(db.Integer, db.ForeignKey('response.id'), nullable=False)
     question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
@@ -78,7 +123,7 @@ class Answer(db.Model):
     def __repr__(self):
         return f"Answer('{self.answer_text[:20]}...')"
 
-class Dataset(db.Model):
+class Dataset(_JsonColumnCache, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -99,14 +144,15 @@ class Dataset(db.Model):
         """Return list of column names."""
         if self.columns:
             try:
-                return json.loads(self.columns)
+                # Copy so callers can't alter the cached list
+                return list(self._parsed_json('columns'))
             except Exception:
                 return []
         return []
     
     def set_columns(self, columns_list):
         """Set column names from a list."""
-        self.columns = json.dumps(columns_list)
+        self.columns = _json_text(columns_list)
     
     def get_sample_data(self, limit=5):
         """Return sample data from the dataset for preview."""
@@ -125,9 +171,9 @@ class Dataset(db.Model):
             if self.filename not in it_olympics_files:
                 return []  # Skip old datasets silently
                 
-            import pandas as pd
-            df = pd.read_csv(self.file_path)
-            return df.head(limit).to_dict('records')
+            # Only the previewed rows are parsed, not the whole file
+            rows = _csv_head(file_key(self.file_path), limit)
+            return [dict(row) for row in rows]
         except Exception as e:
             print(f"Error reading dataset sample: {e}")
             return [] 
\ No newline at end of file
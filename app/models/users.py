@@ -1,8 +1,10 @@
 import os
 import csv
 import hashlib
+import threading
 from functools import wraps
 from flask import session, redirect, url_for, flash
+from app.utils.file_utils import file_key
 
 # Path to the users spreadsheet
 USERS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'instance', 'users.csv')
@@ -13,6 +15,18 @@ STUDENTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__fi
 # Path to the sections file
 SECTIONS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'instance', 'sections.csv')
 
+# Parsed users.csv rows by username, reused until the file changes: rewrites swap the inode
+# and appends grow it, so (path, mtime, size, inode) identifies the contents
+_USERS_CACHE = {'key': None, 'rows': {}}
+_USERS_LOCK = threading.Lock()
+
+# Parsed sections.csv, and each section file's students keyed by (path, section name), cached the same way
+_SECTIONS_CACHE = {'key': None, 'sections': []}
+_STUDENTS_CACHE = {}
+_SECTIONS_LOCK = threading.Lock()
+# First Student seen for each student_id, with the cached student lists it was built from
+_STUDENT_INDEX = {'sources': (), 'index': {}}
+
 # Ensure the users file exists
 def initialize_users_file():
     if not os.path.exists(USERS_FILE):
@@ -233,96 +247,70 @@ class Section:
         self.name = name
         self.file_name = file_name
         self.upload_date = upload_date
-        self._students = None
         
     @property
     def students(self):
-        # Lazy load students only when needed
-        if self._students is None:
-            self._students = []
-            file_path = os.path.join(STUDENTS_DIR, self.file_name)
-            if os.path.exists(file_path):
-                with open(file_path, 'r', newline='') as file:
-                    reader = csv.DictReader(file)
-                    for row in reader:
-                        try:
-                            student = Student(
-                                row.get('student_id', ''),
-                                row.get('fullname', ''),
-                                row.get('is_irregular', 'No'),
-                                row.get('email', ''),
-                                row.get('grade_level', ''),
-                                row.get('username', ''),
-                                None,
-                                self.name
-                            )
-                            self._students.append(student)
-                        except Exception as e:
-                            print(f"Error loading student: {e}")
-        return self._students
+        # Section objects are cached, so re-check the file on every access
+        return list(_load_students(self.file_name, self.name))
     
     @property
     def student_count(self):
         return len(self.students)
 
-# Get user by username
-def get_user(username):
+# Rows of the users file grouped by username, in file order
+def _load_users():
     if not os.path.exists(USERS_FILE):
         initialize_users_file()
-        
-    with open(USERS_FILE, 'r', newline='') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row['username'] == username:
-                user = User(row['username'], row['role'])
-                user.email = row.get('email', '')
-                user.name = row.get('name', '')
-                user.verification_code = row.get('verification_code', '')
-                user.verified = row.get('verified', 'False').lower() == 'true'
-                return user
-    return None
+
+    key = file_key(USERS_FILE)
+    with _USERS_LOCK:
+        if _USERS_CACHE['key'] != key:
+            rows = {}
+            with open(USERS_FILE, 'r', newline='') as file:
+                for row in csv.DictReader(file):
+                    rows.setdefault(row['username'], []).append(row)
+            _USERS_CACHE['rows'] = rows
+            _USERS_CACHE['key'] = key
+        return _USERS_CACHE['rows']
+
+# Build a User from a users file row
+def _user_from_row(row):
+    user = User(row['username'], row['role'])
+    user.email = row.get('email', '')
+    user.name = row.get('name', '')
+    user.verification_code = row.get('verification_code', '')
+    user.verified = row.get('verified', 'False').lower() == 'true'
+    return user
+
+# Get user by username
+def get_user(username):
+    rows = _load_users().get(username)
+    return _user_from_row(rows[0]) if rows else None
 
 # Get user by email
 def get_user_by_email(email):
-    if not os.path.exists(USERS_FILE):
-        initialize_users_file()
-        
-    with open(USERS_FILE, 'r', newline='') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row.get('email', '').lower() == email.lower():
-                user = User(row['username'], row['role'])
-                user.email = row.get('email', '')
-                user.name = row.get('name', '')
-                user.verification_code = row.get('verification_code', '')
-                user.verified = row.get('verified', 'False').lower() == 'true'
-                return user
+    email = email.lower()
+    for rows in _load_users().values():
+        for row in rows:
+            if row.get('email', '').lower() == email:
+                return _user_from_row(row)
     return None
 
 # Authenticate user
 def authenticate_user(username, password):
-    if not os.path.exists(USERS_FILE):
-        initialize_users_file()
-    
+    password_hash = hash_password(password)
+
     # Check admin/regular users first
-    with open(USERS_FILE, 'r', newline='') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row['username'] == username:
-                # Check if user is verified (for admins)
-                verified = row.get('verified', 'False').lower() == 'true'
-                if row.get('role') == 'admin' and not verified:
-                    # Admin not verified yet, cannot login with password
-                    continue
-                
-                # Check password
-                if row.get('password_hash') == hash_password(password):
-                    user = User(row['username'], row['role'])
-                    user.email = row.get('email', '')
-                    user.name = row.get('name', '')
-                    user.verification_code = row.get('verification_code', '')
-                    user.verified = verified
-                    return user
+    for row in _load_users().get(username, ()):
+        # Check if user is verified (for admins)
+        verified = row.get('verified', 'False').lower() == 'true'
+        if row.get('role') == 'admin' and not verified:
+            # Admin not verified yet, cannot login with password
+            continue
+
+        # Check password
+        if row.get('password_hash') == password_hash:
+            return _user_from_row(row)
     
     # Look through all student sections for matching credentials
     sections = get_all_sections()
@@ -373,26 +361,86 @@ def register_user(username, password, role='student', email='', name='', verific
     
     return True
 
+# Shared result for a missing section file, so _student_index sees an unchanged source
+_NO_STUDENTS = ()
+
+# Students of one section file, parsed once per version of the file
+def _load_students(file_name, section_name):
+    file_path = os.path.join(STUDENTS_DIR, file_name)
+    cache_key = (file_path, section_name)
+    try:
+        key = file_key(file_path)
+    except OSError:
+        _STUDENTS_CACHE.pop(cache_key, None)
+        return _NO_STUDENTS
+
+    with _SECTIONS_LOCK:
+        cached = _STUDENTS_CACHE.get(cache_key)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        students = []
+        with open(file_path, 'r', newline='') as file:
+            reader = csv.DictReader(file)
+            for row in reader:
+                try:
+                    student = Student(
+                        row.get('student_id', ''),
+                        row.get('fullname', ''),
+                        row.get('is_irregular', 'No'),
+                        row.get('email', ''),
+                        row.get('grade_level', ''),
+                        row.get('username', ''),
+                        None,
+                        section_name
+                    )
+                    students.append(student)
+                except Exception as e:
+                    print(f"Error loading student: {e}")
+        _STUDENTS_CACHE[cache_key] = (key, students)
+        return students
+
 # Get all sections
 def get_all_sections():
     if not os.path.exists(SECTIONS_FILE):
         initialize_sections_file()
     
     sections = []
-    try:
-        with open(SECTIONS_FILE, 'r', newline='') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                section = Section(
-                    row['section_name'],
-                    row['file_name'],
-                    row['upload_date']
-                )
-                sections.append(section)
-    except Exception as e:
-        print(f"Error reading sections file: {e}")
+    with _SECTIONS_LOCK:
+        try:
+            key = file_key(SECTIONS_FILE)
+            if _SECTIONS_CACHE['key'] == key:
+                return list(_SECTIONS_CACHE['sections'])
+            with open(SECTIONS_FILE, 'r', newline='') as file:
+                reader = csv.DictReader(file)
+                for row in reader:
+                    section = Section(
+                        row['section_name'],
+                        row['file_name'],
+                        row['upload_date']
+                    )
+                    sections.append(section)
+            _SECTIONS_CACHE['sections'] = sections
+            _SECTIONS_CACHE['key'] = key
+        except Exception as e:
+            print(f"Error reading sections file: {e}")
     
-    return sections
+    return list(sections)
+
+# Student by ID across all sections, rebuilt only when a section or student file changed
+def _student_index():
+    sources = tuple(_load_students(section.file_name, section.name) for section in get_all_sections())
+    with _SECTIONS_LOCK:
+        cached = _STUDENT_INDEX['sources']
+        # The cached lists are held here, so identity means "file not re-parsed since"
+        if len(cached) != len(sources) or any(old is not new for old, new in zip(cached, sources)):
+            index = {}
+            for students in sources:
+                for student in students:
+                    index.setdefault(student.student_id, student)
+            _STUDENT_INDEX['index'] = index
+            _STUDENT_INDEX['sources'] = sources
+        return _STUDENT_INDEX['index']
 
 # Get a specific section by name
 def get_section(section_name):
@@ -417,12 +465,7 @@ def get_student_by_id(student_id):
     if not student_id:
         return None
     
-    sections = get_all_sections()
-    for section in sections:
-        for student in section.students:
-            if student.student_id == student_id:
-                return student
-    return None
+    return _student_index().get(student_id)
 
 # Save a new section from uploaded Excel file
 def save_section_from_excel(section_name, excel_file):
@@ -433,6 +476,7 @@ def save_section_from_excel(section_name, excel_file):
     # Generate a unique filename
     import uuid
     from datetime import datetime
+    import numpy as np
     import pandas as pd
     
     # Generate temporary Excel filename
@@ -481,21 +525,22 @@ def save_section_from_excel(section_name, excel_file):
         # Convert boolean/numeric to Yes/No string
         # If True or 1, it's Regular (so is_irregular is "No")
         # If False or 0, it's Irregular (so is_irregular is "Yes")
-        is_irregular = []
-        for val in df['isregular']:
-            if isinstance(val, bool):
-                is_irregular.append("No" if val else "Yes")
-            elif isinstance(val, (int, float)):
-                is_irregular.append("No" if val else "Yes")
-            elif isinstance(val, str):
-                val_lower = val.lower()
-                if val_lower in ['true', 'yes', '1', 'regular']:
-                    is_irregular.append("No")
-                else:
-                    is_irregular.append("Yes")
-            else:
-                is_irregular.append("Yes")
-        columns_to_extract['is_irregular'] = is_irregular
+        # Whole-column operations for the usual all-bool/number or all-text columns; blank cells keep
+        # their truthiness (NaN counts as regular, None does not), and other mixes go cell by cell
+        is_regular = df['isregular']
+        kind = pd.api.types.infer_dtype(is_regular, skipna=True)
+        if kind in ('boolean', 'integer', 'floating', 'mixed-integer-float'):
+            regular = is_regular.astype(bool)
+        elif kind == 'string':
+            regular = is_regular.str.lower().isin(['true', 'yes', '1', 'regular'])
+            regular |= is_regular.isna() & is_regular.astype(bool)
+        else:
+            regular = [
+                val.lower() in ['true', 'yes', '1', 'regular'] if isinstance(val, str)
+                else isinstance(val, (bool, int, float)) and bool(val)
+                for val in is_regular
+            ]
+        columns_to_extract['is_irregular'] = np.where(regular, "No", "Yes")
         
         # Handle email
         columns_to_extract['email'] = df['email']
@@ -503,14 +548,11 @@ def save_section_from_excel(section_name, excel_file):
         # Handle grade level
         columns_to_extract['grade_level'] = df['gradelevel']
         
-        # Create new dataframe with only the columns we need
-        new_df = pd.DataFrame(columns_to_extract)
-        
-        # Check for duplicate student IDs
-        duplicate_students = []
-        for student_id in new_df['student_id']:
-            if student_id_exists(student_id):
-                duplicate_students.append(student_id)
+        # Check for duplicate student IDs against one index instead of a full scan per row
+        known_ids = _student_index()
+        duplicate_students = [
+            student_id for student_id in columns_to_extract['student_id'] if student_id and student_id in known_ids
+        ]
         
         if duplicate_students:
             # Clean up temporary files
@@ -520,8 +562,16 @@ def save_section_from_excel(section_name, excel_file):
                 os.remove(file_path)
             return False, f"Duplicate student IDs found: {', '.join(duplicate_students)}. Student IDs must be unique across all sections."
         
-        # Save as CSV
-        new_df.to_csv(file_path, index=False)
+        # Save as CSV, streaming rows from the extracted columns instead of building a second
+        # DataFrame; missing cells are written empty, as DataFrame.to_csv did
+        def csv_cells(column):
+            column = pd.Series(column)
+            return column.astype(object).where(column.notna(), None)
+        
+        with open(file_path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(list(columns_to_extract))
+            writer.writerows(zip(*(csv_cells(column) for column in columns_to_extract.values())))
         
         # Clean up temporary Excel file
         os.remove(temp_excel_path)
@@ -554,12 +604,7 @@ def student_id_exists(student_id):
     if not student_id:
         return False
     
-    sections = get_all_sections()
-    for section in sections:
-        for student in section.students:
-            if student.student_id == student_id:
-                return True
-    return False
+    return student_id in _student_index()
 
 # Register students from a section as users
 def register_students_from_section(section_name):
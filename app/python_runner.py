@@ -0,0 +1,148 @@
+"""
+Stand-alone runner for one Python submission.
+
+code_evaluator starts a fresh interpreter on this file for every submission, so nothing a
+student changes (builtins, sys, imported modules) can reach the next one. It only uses the
+standard library and never imports the app package. The job arrives as JSON on stdin and the
+result goes back as one JSON object on the original stdout.
+"""
+
+import builtins
+import contextlib
+import io
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import time
+import traceback
+from types import CodeType
+from typing import Any, Dict, List, Optional, Union
+
+
+def _python_namespace() -> Dict[str, Any]:
+    """Fresh globals for one run of a submission, as if it were executed as a script"""
+    return {'__name__': '__main__', '__builtins__': builtins}
+
+
+def run_asserts(code: str, assert_lines: List[str]) -> Dict[str, Any]:
+    """Exec the student's code once, then each assert against its namespace"""
+    sys.stdin, sys.stdout = io.StringIO(), io.StringIO()
+    namespace = _python_namespace()
+    try:
+        exec(compile(code, '<student>', 'exec'), namespace)
+    except BaseException:
+        return {'error': traceback.format_exc(limit=-1)}
+
+    passed = 0
+    errors = []
+    for a in assert_lines:
+        try:
+            exec(compile(a, '<assert>', 'exec'), namespace)
+            passed += 1
+        except BaseException as e:
+            errors.append(f"{a} -> {type(e).__name__}: {str(e)}")
+    return {'total': len(assert_lines), 'passed': passed, 'errors': errors}
+
+
+def run_case(program: Union[str, CodeType], input_line: str) -> str:
+    """Run the student's program (source or compiled) with one input line on stdin and return what it printed"""
+    if isinstance(program, str):
+        program = compile(program, '<solution>', 'exec')
+    sys.stdin = io.StringIO(input_line + '\n')
+    sys.stdout = captured = io.StringIO()
+    try:
+        exec(program, _python_namespace())
+    except BaseException:
+        # Like a crashed script, only what was printed before the failure is compared
+        pass
+    return captured.getvalue().strip()
+
+
+def _forked_case(program: CodeType, input_line: str, timeout: float) -> Optional[str]:
+    """run_case in a forked child, so no module or sys state reaches the next case; None on timeout"""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        with os.fdopen(write_fd, 'w', encoding='utf-8', errors='replace') as pipe:
+            pipe.write(run_case(program, input_line))
+        os._exit(0)
+    os.close(write_fd)
+    chunks = []
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([read_fd], [], [], remaining)[0]:
+                return None
+            chunk = os.read(read_fd, 65536)
+            if not chunk:
+                return b''.join(chunks).decode('utf-8', errors='replace')
+            chunks.append(chunk)
+    finally:
+        os.close(read_fd)
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+
+def _spawned_case(code: str, input_line: str, timeout: float) -> Optional[str]:
+    """run_case in a fresh interpreter on this script, where fork is unavailable; None on timeout"""
+    try:
+        result = subprocess.run([sys.executable, '-I', os.path.abspath(__file__)],
+                                input=json.dumps({'mode': 'case', 'args': [code, input_line]}),
+                                capture_output=True, text=True, encoding='utf-8', timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None
+    return json.loads(result.stdout) if result.stdout else ''
+
+
+def run_interactive(code: str, input_lines: List[str], expected_lines: List[str],
+                    case_timeout: float) -> Dict[str, Any]:
+    """Run the student's program once per input line, each in its own process, and compare what it prints"""
+    # Parse the program once; every forked case re-executes the same code object
+    try:
+        program = compile(code, '<solution>', 'exec')
+    except SyntaxError as e:
+        return {'total': len(input_lines), 'passed': 0, 'errors': [f"SyntaxError: {e}"]}
+
+    passed = 0
+    errors = []
+    for i, (input_line, expected_line) in enumerate(zip(input_lines, expected_lines), 1):
+        if hasattr(os, 'fork'):
+            actual_output = _forked_case(program, input_line, case_timeout)
+        else:
+            actual_output = _spawned_case(code, input_line, case_timeout)
+        if actual_output is None:
+            errors.append(f'Test {i}: Error - timed out after {case_timeout:g} seconds')
+        elif actual_output == expected_line:
+            passed += 1
+        else:
+            errors.append(f'Test {i}: Expected "{expected_line}", got "{actual_output}"')
+    return {'total': len(input_lines), 'passed': passed, 'errors': errors}
+
+
+_JOBS = {'asserts': run_asserts, 'interactive': run_interactive, 'case': run_case}
+
+
+def main() -> None:
+    job = json.load(sys.stdin)
+    # Keep the real stdout for the result and point fd 1 at /dev/null, so not even os.write(1, ...)
+    # from the submission can corrupt the reply
+    result_out = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+    result = _JOBS[job['mode']](*job['args'])
+    sys.stdin, sys.stdout = sys.__stdin__, sys.__stdout__
+    json.dump(result, result_out)
+    result_out.flush()
+    # Skip interpreter teardown; the submission may have left threads or atexit hooks behind
+    os._exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,7 @@ from io import BytesIO
 import requests, time
 import re
 from rapidfuzz import fuzz
+from sqlalchemy.orm import selectinload, undefer_group
 import json
 import subprocess
 import tempfile
@@ -167,7 +168,7 @@ def new_form():
 @admin_required
 def edit_form(form_id):
     form = Form.query.get_or_404(form_id)
-    questions = Question.query.filter_by(form_id=form_id).order_by(Question.order).all()
+    questions = Question.query.options(undefer_group('content')).filter_by(form_id=form_id).order_by(Question.order).all()
     return render_template('edit_form.html', form=form, questions=questions, question_categories=QUESTION_CATEGORY_CHOICES)
 
 @main.route('/form/<int:form_id>/question/new', methods=['POST'])
@@ -1768,7 +1769,7 @@ def view_form(form_id):
             flash('You have already submitted this form. Redirecting to your submission...', 'info')
             return redirect(url_for('main.view_my_response', response_id=existing_response.id))
     
-    questions = Question.query.filter_by(form_id=form_id).order_by(Question.order).all()
+    questions = Question.query.options(undefer_group('content')).filter_by(form_id=form_id).order_by(Question.order).all()
     # Record start time for speed badge
     try:
         from datetime import datetime
@@ -1804,7 +1805,7 @@ def submit_form(form_id):
         pass
     
     # Get all questions for this form
-    questions = Question.query.filter_by(form_id=form_id).all()
+    questions = Question.query.options(undefer_group('content')).filter_by(form_id=form_id).all()
     
     for question in questions:
         answer_text = ''
@@ -1948,7 +1949,7 @@ def submit_form(form_id):
 def view_responses(form_id):
     form = Form.query.get_or_404(form_id)
     # Fetch responses for the form
-    responses = Response.query.filter_by(form_id=form_id).order_by(Response.created_at.asc()).all()
+    responses = Response.query.options(selectinload(Response.answers)).filter_by(form_id=form_id).order_by(Response.created_at.asc()).all()
     
     # Compute total possible points for the form
     form_questions = Question.query.filter_by(form_id=form_id).all()
@@ -2002,7 +2003,7 @@ def clear_form_responses(form_id):
     """Delete all responses (and their answers) for the specified form."""
     form = Form.query.get_or_404(form_id)
     # Delete each response to ensure ORM cascades remove answers as well
-    responses = Response.query.filter_by(form_id=form_id).all()
+    responses = Response.query.options(selectinload(Response.answers)).filter_by(form_id=form_id).all()
     for resp in responses:
         db.session.delete(resp)
     db.session.commit()
@@ -2024,7 +2025,7 @@ def view_response(response_id):
         return redirect(url_for('main.index'))
     
     # Compute overall earned points and percentage
-    questions = Question.query.filter_by(form_id=form.id).all()
+    questions = Question.query.options(undefer_group('content')).filter_by(form_id=form.id).all()
     total_possible_points = sum(q.points for q in questions) or 0
     q_points = {q.id: q.points for q in questions}
     earned_points = 0.0
@@ -2130,7 +2131,7 @@ def view_my_response(response_id):
         return redirect(url_for('main.index'))
     
     # Compute overall earned points and percentage
-    questions = Question.query.filter_by(form_id=form.id).all()
+    questions = Question.query.options(undefer_group('content')).filter_by(form_id=form.id).all()
     total_possible_points = sum(q.points for q in questions) or 0
     q_points = {q.id: q.points for q in questions}
     earned_points = 0.0
@@ -2412,8 +2413,8 @@ def toggle_dataset_status(dataset_id):
 def _get_form_analytics_data(form_id):
     """Compute analytics data for a form and return a dictionary."""
     form = Form.query.get_or_404(form_id)
-    responses = Response.query.filter_by(form_id=form_id).all()
-    questions = Question.query.filter_by(form_id=form_id).all()
+    responses = Response.query.options(selectinload(Response.answers)).filter_by(form_id=form_id).all()
+    questions = Question.query.options(undefer_group('content'), selectinload(Question.answers)).filter_by(form_id=form_id).all()
     
     total_responses = len(responses)
     total_questions = len(questions)
@@ -2440,7 +2441,7 @@ def _get_form_analytics_data(form_id):
     avg_score = sum(r['percentage'] for r in response_stats) / len(response_stats) if response_stats else 0
     
     question_stats = []
-    response_ids = [r.id for r in responses]
+    response_ids = {r.id for r in responses}
     for question in questions:
         answers = [a for a in question.answers if a.response_id in response_ids]
         correct_count = sum(1 for a in answers if a.is_correct)
@@ -0,0 +1,7 @@
+import os
+
+
+def file_key(path):
+    """Identity of a file's current contents (path, mtime, size, inode), for caches of parsed files"""
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size, stat.st_ino)
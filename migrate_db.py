@@ -57,9 +57,34 @@ def migrate_database():
             conn.close()
         return False
 
+def add_indexes():
+    """Create the composite indexes declared on Question and Answer for databases that predate them"""
+    
+    db_path = 'instance/forms.db'
+    
+    if not os.path.exists(db_path):
+        print(f"Database not found at {db_path}")
+        return False
+    
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.execute('CREATE INDEX IF NOT EXISTS ix_question_form_order ON question (form_id, "order")')
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_answer_response_question ON answer (response_id, question_id)")
+        conn.commit()
+        conn.close()
+        print("✅ Question and answer indexes are in place")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Index migration failed: {e}")
+        if 'conn' in locals():
+            conn.close()
+        return False
+
 if __name__ == "__main__":
     print("🔄 Starting database migration...")
-    success = migrate_database()
+    success = migrate_database() and add_indexes()
     if success:
         print("\n🎉 Migration completed! You can now run the Flask application.")
     else:
@@ -17,3 +17,17 @@ def test_ai_parse_text_no_keywords_neutral():
     assert ok is False
     assert conf == 50
     assert isinstance(fb, str) and len(fb) > 0
+
+
+def test_lm_studio_probe_is_cached(monkeypatch):
+    import app.ai_evaluator as ai_module
+    probes = []
+
+    class _Ok:
+        status_code = 200
+
+    monkeypatch.setattr(ai_module.requests, 'get', lambda *a, **k: probes.append(1) or _Ok())
+    evaluator = AIEvaluator()
+    assert evaluator._check_lm_studio_available() is True
+    assert evaluator._check_lm_studio_available() is True
+    assert len(probes) == 1
@@ -0,0 +1,675 @@
+import os
+import shutil
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app.code_evaluator as ce
+from app.code_evaluator import CodeEvaluator
+
+
+JS_TESTS = "const assert = require('assert');\nassert.strictEqual(add(1, 2), 3);\nassert.strictEqual(add(2, 2), 4);"
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node not installed')
+def test_javascript_reuses_cached_test_bytecode(tmp_path, monkeypatch):
+    monkeypatch.setattr(ce, '_JS_CACHE_DIR', str(tmp_path))
+    evaluator = CodeEvaluator()
+    problem = ce.ProblemData(unit_tests=JS_TESTS)
+
+    ok, score, _ = evaluator._evaluate_javascript('function add(a, b) { return a + b; }', problem)
+    assert ok is True and score == 100
+    cache_files = [os.path.join(root, name) for root, _, names in os.walk(tmp_path) for name in names]
+    assert len(cache_files) == 1 and cache_files[0].endswith('tests.cache')
+
+    # Second run consumes the cache and still reports failures correctly
+    ok, score, fb = evaluator._evaluate_javascript('function add(a, b) { return a - b; }', problem)
+    assert ok is False and 'AssertionError' in fb
+
+
+def test_parse_tests_passed_line():
+    assert ce._parse_tests_passed("3/5 tests passed") == (3, 5)
+    assert ce._parse_tests_passed("debug output\n10/12 tests passed") == (10, 12)
+    assert ce._parse_tests_passed("no summary here") is None
+    assert ce._parse_tests_passed("x/y tests passed") is None
+
+
+def test_compute_score_partial_credit_brackets():
+    assert ce._compute_score(0, 0, 100) == 0
+    assert ce._compute_score(5, 5, 100) == 100
+    assert ce._compute_score(4, 5, 100) == 90
+    assert ce._compute_score(3, 5, 100) == 75
+    assert ce._compute_score(1, 5, 100) == 25
+    assert ce._compute_score(1, 6, 100) == 0
+
+
+def test_last_output_line_decodes_only_the_summary():
+    assert ce._last_output_line(b"noise\n" * 1000 + b"3/4 tests passed\n") == "3/4 tests passed"
+    assert ce._last_output_line(b"") == ""
+
+
+def test_split_javac_errors_groups_by_file():
+    stderr = (
+        "/tmp/b/Solution1.java:3: error: cannot find symbol\n"
+        "  return x;\n"
+        "/tmp/b/Harness2.java:7: error: ';' expected\n"
+    )
+    errors = CodeEvaluator()._split_javac_errors(stderr)
+    assert set(errors) == {'Solution1', 'Harness2'}
+    assert 'cannot find symbol' in errors['Solution1']
+
+
+def test_load_problem_data_uses_cached_csv(monkeypatch):
+    evaluator = CodeEvaluator()
+    first = evaluator._load_problem_data(2)
+    assert first is not None and first.language == 'C' and first.max_score == 100
+
+    # Further lookups are served from the in-memory index without re-reading the file
+    monkeypatch.setattr(ce.csv, 'DictReader', lambda *a, **k: pytest.fail('CSV re-read'))
+    assert evaluator._load_problem_data('2') is first
+    assert evaluator._load_problem_data(999999) is None
+
+
+def test_python_asserts_run_in_one_runner_process_per_submission():
+    evaluator = CodeEvaluator()
+    problem = ce.ProblemData(unit_tests="assert add(1, 2) == 3\nassert add(2, 2) == 5")
+
+    ok, score, fb = evaluator._evaluate_python('def plus(a, b):\n    return a + b\n', problem)
+    assert ok is False and score == 50
+    assert 'Tests passed: 1/2' in fb and 'AssertionError' in fb
+
+    ok, _, fb = evaluator._evaluate_python('raise ValueError("boom")\n', problem)
+    assert ok is False and 'ValueError: boom' in fb
+
+    # A malformed assert only fails itself instead of breaking the whole run
+    problem = ce.ProblemData(unit_tests="assert add(1, 2) == 3\nassert add(1, 2 == 3")
+    ok, score, fb = evaluator._evaluate_python('def add(a, b):\n    return a + b\n', problem)
+    assert 'Tests passed: 1/2' in fb and 'SyntaxError' in fb
+
+
+def test_python_interactive_cases_run_through_one_runner_process_per_submission():
+    evaluator = CodeEvaluator()
+    problem = ce.ProblemData(interactive_inputs="2\n5", expected_outputs="4\n10")
+
+    ok, score, fb = evaluator._evaluate_python('n = int(input())\nprint(n * 2)\n', problem)
+    assert ok is True and score == 100 and 'Interactive tests passed: 2/2' in fb
+
+    ok, score, fb = evaluator._evaluate_python('n = int(input()\nprint(n)\n', problem)
+    assert ok is False and score == 0 and 'SyntaxError' in fb
+
+
+def test_python_submissions_do_not_share_interpreter_state():
+    evaluator = CodeEvaluator()
+    problem = ce.ProblemData(unit_tests="assert g(-2) == 2")
+
+    # One student's changes to builtins or sys must not leak into the next submission
+    tamper = 'import builtins, sys\nbuiltins.abs = lambda x: 0\nsys.modules["math"] = None\ndef g(x):\n    return abs(x)\n'
+    ok, _, _ = evaluator._evaluate_python(tamper, problem)
+    assert ok is False
+    ok, score, fb = evaluator._evaluate_python('import math\ndef g(x):\n    return abs(x)\n', problem)
+    assert ok is True and score == 100, fb
+
+    ok, _, fb = evaluator._evaluate_python('import os\nos._exit(3)\n', problem)
+    assert ok is False and 'exit code 3' in fb
+
+
+def test_python_timeout_only_stops_its_own_submission(monkeypatch):
+    evaluator = CodeEvaluator()
+    problem = ce.ProblemData(unit_tests="assert g(-2) == 2")
+    real_run_job = ce._run_python_job
+    monkeypatch.setattr(ce, '_run_python_job', lambda mode, args, timeout: real_run_job(mode, args, 2))
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        stuck = pool.submit(evaluator._evaluate_python, 'while True:\n    pass\n', problem)
+        time.sleep(0.5)
+        ok, score, fb = evaluator._evaluate_python('def g(x):\n    return abs(x)\n', problem)
+        assert ok is True and score == 100, fb
+        assert stuck.result(timeout=10) == (False, 0, "Code execution timed out")
+
+
+def test_python_interactive_cases_are_isolated_and_timed_out_separately(monkeypatch):
+    monkeypatch.setattr(ce, '_PYTHON_CASE_TIMEOUT', 1)
+    evaluator = CodeEvaluator()
+    problem = ce.ProblemData(interactive_inputs="0\n2\n5", expected_outputs="0\n4\n10")
+    # Module state set by one case must not be visible to the next, and a hanging case only fails itself
+    code = (
+        "import sys\n"
+        "n = int(input())\n"
+        "while n == 0:\n"
+        "    pass\n"
+        "print('leaked' if hasattr(sys, 'seen') else n * 2)\n"
+        "sys.seen = True\n"
+    )
+    ok, score, fb = evaluator._evaluate_python(code, problem)
+    assert 'Interactive tests passed: 2/3' in fb
+    assert 'Test 1: Error - timed out after 1 seconds' in fb and 'leaked' not in fb
+
+
+def test_ai_and_unit_tests_run_concurrently(monkeypatch):
+    import threading
+    unit_started = threading.Event()
+
+    def fake_ai(code, statement, language, unit_tests):
+        # Only completes if the unit tests are running at the same time
+        assert unit_started.wait(timeout=5)
+        return True, 90, "looks right"
+
+    def fake_unit(self, code, problem_data):
+        unit_started.set()
+        return True, 100, "Tests passed: 1/1"
+
+    monkeypatch.setattr(ce.ai_evaluator, 'evaluate_code', fake_ai)
+    evaluator = CodeEvaluator()
+    problem = evaluator._custom_problem_data("assert f() == 1", 'python')
+    ai_result, unit_result = evaluator._run_ai_and_unit_tests(
+        True, 'def f(): return 1', problem, 'python', problem.unit_tests, 'AI Evaluation', fake_unit
+    )
+    assert ai_result == (True, 90, "looks right") and unit_result[1] == 100
+
+
+def test_ai_available_reuses_the_ai_evaluator_probe(monkeypatch):
+    import app.ai_evaluator as ai_module
+    probes = []
+
+    class _Ok:
+        status_code = 200
+
+    monkeypatch.setattr(ai_module.requests, 'get', lambda *a, **k: probes.append(1) or _Ok())
+    monkeypatch.setattr(ce.ai_evaluator, '_ai_check_time', 0.0)
+    monkeypatch.setattr(ce, 'AI_AVAILABLE', ce.AI_AVAILABLE)
+    evaluator = CodeEvaluator()
+
+    assert evaluator._ai_available() is True
+    assert evaluator._ai_available() is True
+    assert len(probes) == 1
+
+    # Once AIEvaluator's TTL has passed LM Studio is probed again
+    monkeypatch.setattr(ce.ai_evaluator, '_ai_check_time', ce.ai_evaluator._ai_check_time - ce.ai_evaluator.availability_ttl)
+    evaluator._ai_available()
+    assert len(probes) == 2
+
+
+def test_evaluate_batch_keeps_submission_order():
+    evaluator = CodeEvaluator()
+    codes = ['def add(a, b):\n    return a + b\n', 'def add(a, b):\n    return a - b\n'] * 3
+    results = evaluator.evaluate_batch(codes, "assert add(1, 2) == 3\nassert add(2, 2) == 4", 'python')
+    assert [score for _, score, _ in results] == [100, 0] * 3
+
+
+def test_evaluate_batch_grades_identical_submissions_once(monkeypatch):
+    seen = []
+    def fake_custom(self, code, unit_tests, language):
+        seen.append(code)
+        return True, 100, code
+    monkeypatch.setattr(CodeEvaluator, 'evaluate_code_with_custom_tests', fake_custom)
+    results = CodeEvaluator().evaluate_batch(['a', 'b', 'a', 'a'], "assert(f() == 1);", 'c')
+    assert sorted(seen) == ['a', 'b']
+    assert [fb for _, _, fb in results] == ['a', 'b', 'a', 'a']
+
+
+def test_ai_only_skips_ai_call_for_trivial_submissions(monkeypatch):
+    monkeypatch.setattr(ce.ai_evaluator, 'evaluate_code', lambda *a: pytest.fail('AI called'))
+    evaluator = CodeEvaluator()
+    ok, score, fb = evaluator._evaluate_ai_only_general('# Write your code here', ce.ProblemData(), 'python')
+    assert ok is False and score == 0 and "didn't attempt" in fb
+
+
+@pytest.mark.skipif(shutil.which('gcc') is None, reason='gcc not installed')
+def test_c_regrade_reuses_cached_binary(tmp_path, monkeypatch):
+    monkeypatch.setattr(ce, '_NATIVE_CACHE_DIR', str(tmp_path))
+    evaluator = CodeEvaluator()
+    problem = ce.ProblemData(unit_tests="#include <assert.h>\nint main() {\n    assert(twice(2) == 4);\n    return 0;\n}")
+    code = "int twice(int x) { return x * 2; }"
+    assert evaluator._evaluate_c(code, problem)[1] == 100
+
+    real_run = ce.subprocess.run
+    def no_compiler(cmd, *a, **k):
+        assert 'gcc' not in cmd, 'recompiled an identical harness'
+        return real_run(cmd, *a, **k)
+    monkeypatch.setattr(ce.subprocess, 'run', no_compiler)
+    assert evaluator._evaluate_c(code, problem)[1] == 100
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason='POSIX ownership checks')
+def test_private_dir_refuses_directories_it_does_not_own(tmp_path, monkeypatch):
+    loose = tmp_path / 'loose'
+    loose.mkdir(mode=0o777)
+    os.chmod(loose, 0o777)
+    assert ce._private_dir(str(loose)) == str(loose) and (loose.stat().st_mode & 0o777) == 0o700
+    assert (os.stat(ce._private_dir(str(tmp_path / 'fresh'))).st_mode & 0o777) == 0o700
+
+    (tmp_path / 'planted').symlink_to(loose)
+    with pytest.raises(PermissionError):
+        ce._private_dir(str(tmp_path / 'planted'))
+    monkeypatch.setattr(ce.os, 'getuid', lambda: os.stat(loose).st_uid + 1)
+    with pytest.raises(PermissionError):
+        ce._private_dir(str(loose))
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason='POSIX ownership checks')
+def test_java_class_caches_are_private_dirs(tmp_path, monkeypatch):
+    work_dir = tmp_path / 'work'
+    work_dir.mkdir()
+    (work_dir / 'Solution.class').write_bytes(b'\xca\xfe\xba\xbe')
+    cache_root = tmp_path / 'java-solutions'
+    monkeypatch.setattr(ce, '_JAVA_SOLUTION_CACHE_DIR', str(cache_root))
+    CodeEvaluator()._cache_java_solution(str(work_dir), str(cache_root / 'key'))
+    assert (cache_root / 'key' / 'Solution.class').read_bytes() == b'\xca\xfe\xba\xbe'
+    assert (os.stat(cache_root / 'key').st_mode & 0o777) == 0o700
+
+    # A cache entry someone else planted is not filled (and so never put on the classpath)
+    planted = tmp_path / 'planted'
+    planted.mkdir()
+    (cache_root / 'other').symlink_to(planted)
+    CodeEvaluator()._cache_java_solution(str(work_dir), str(cache_root / 'other'))
+    assert not (planted / 'Solution.class').exists()
+
+
+@pytest.mark.skipif(shutil.which('gcc') is None, reason='gcc not installed')
+def test_native_cache_hits_refresh_mtime_and_vanished_binaries_are_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.setattr(ce, '_NATIVE_CACHE_DIR', str(tmp_path))
+    source = 'int main(void) { return 0; }\n'
+    exe, _ = ce._build_native('gcc', '.c', source)
+    os.utime(exe, (1, 1))
+    assert ce._build_native('gcc', '.c', source) == (exe, "")
+    assert os.stat(exe).st_mtime > 1
+
+    # The reaper deletes the binary between the cache lookup and the run: it is compiled again
+    real_run_native = ce._run_native
+    vanished = []
+
+    def reaped_first(path):
+        if not vanished:
+            vanished.append(path)
+            os.unlink(path)
+        return real_run_native(path)
+    monkeypatch.setattr(ce, '_run_native', reaped_first)
+    problem = ce.ProblemData(unit_tests="#include <assert.h>\nint main() {\n    assert(twice(2) == 4);\n    return 0;\n}")
+    assert CodeEvaluator()._evaluate_c("int twice(int x) { return x * 2; }", problem)[:2] == (True, 100)
+    assert vanished and os.path.exists(vanished[0])
+
+
+def test_native_compile_prefers_tcc_for_c(monkeypatch):
+    monkeypatch.setattr(ce, '_TCC', '/usr/bin/tcc')
+    monkeypatch.setattr(ce, '_CCACHE', None)
+    assert ce._native_compilers('gcc') == ('/usr/bin/tcc', 'gcc')
+    assert ce._native_compilers('g++') == ('g++',)
+    assert ce._native_compile_command('/usr/bin/tcc', 'a.c', 'a') == ['/usr/bin/tcc', '-o', 'a', 'a.c']
+    assert ce._native_compile_command('gcc', 'a.c', 'a')[0] == 'gcc'
+
+    monkeypatch.setattr(ce, '_TCC', None)
+    assert ce._native_compilers('gcc') == ('gcc',)
+
+
+@pytest.mark.skipif(shutil.which('gcc') is None, reason='gcc not installed')
+def test_c_falls_back_to_gcc_when_tcc_rejects_the_source(tmp_path, monkeypatch):
+    monkeypatch.setattr(ce, '_NATIVE_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(ce, '_TCC', 'tcc')
+    commands = []
+    real_run = ce.subprocess.run
+
+    def fake_tcc(cmd, *a, **k):
+        commands.append(cmd[0])
+        if cmd[0] == 'tcc':
+            return ce.subprocess.CompletedProcess(cmd, 1, '', 'tcc: error: unsupported feature')
+        return real_run(cmd, *a, **k)
+    monkeypatch.setattr(ce.subprocess, 'run', fake_tcc)
+
+    exe, errors = ce._build_native('gcc', '.c', 'int main(void) { return 0; }\n')
+    assert exe is not None and errors == "" and commands[:2] == ['tcc', ce._CCACHE or 'gcc']
+    # The binary is cached under gcc's key, so the next lookup skips both compilers
+    commands.clear()
+    assert ce._build_native('gcc', '.c', 'int main(void) { return 0; }\n') == (exe, "")
+    assert commands == []
+
+    # When gcc fails too, only its diagnostics are reported
+    exe, errors = ce._build_native('gcc', '.c', 'int main(void) { return }\n')
+    assert exe is None and 'tcc:' not in errors and 'error' in errors
+
+
+@pytest.mark.skipif(shutil.which('gcc') is None or ce.resource is None, reason='needs gcc and POSIX rlimits')
+def test_c_runaway_loop_is_stopped_by_cpu_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(ce, '_NATIVE_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(ce, '_NATIVE_CPU_SECONDS', 1)
+    problem = ce.ProblemData(unit_tests="#include <assert.h>\nint main() {\n    assert(spin() == 1);\n    return 0;\n}")
+    code = "int spin(void) { volatile int x = 0; for (;;) x++; return x; }"
+    assert CodeEvaluator()._evaluate_c(code, problem) == (False, 0, "Code execution timed out")
+
+
+@pytest.mark.skipif(shutil.which('gcc') is None, reason='gcc not installed')
+def test_c_harness_declares_any_int_array(tmp_path, monkeypatch):
+    monkeypatch.setattr(ce, '_NATIVE_CACHE_DIR', str(tmp_path))
+    problem = ce.ProblemData(unit_tests=(
+        "#include <assert.h>\nint main() {\n    int nums[] = {1, 2, 3};\n"
+        "    assert(total(nums, 3) == 6);\n    return 0;\n}"
+    ))
+    code = "int total(int *a, int n) { int s = 0; for (int i = 0; i < n; i++) s += a[i]; return s; }"
+    assert CodeEvaluator()._evaluate_c(code, problem)[:2] == (True, 100)
+
+
+def test_run_bounded_keeps_summary_tail_of_large_output():
+    import sys
+    script = 'import sys; print("x" * 2000000); print("3/4 tests passed"); sys.stderr.write("e" * 100000)'
+    result = ce._run_bounded([sys.executable, '-c', script], timeout=10, max_output=1024)
+    assert result.returncode == 0
+    assert len(result.stdout) == 1024 and ce._last_output_line(result.stdout) == "3/4 tests passed"
+    assert result.stderr == b"e" * 1024
+
+
+@pytest.mark.skipif(shutil.which('gcc') is None, reason='gcc not installed')
+def test_c_harness_sizes_results_for_every_assert(tmp_path, monkeypatch):
+    monkeypatch.setattr(ce, '_NATIVE_CACHE_DIR', str(tmp_path))
+    asserts = "".join(f"    assert(twice({n}) == {2 * n});\n" for n in range(12))
+    problem = ce.ProblemData(unit_tests="#include <assert.h>\nint main() {\n" + asserts + "    return 0;\n}")
+    ok, score, fb = CodeEvaluator()._evaluate_c("int twice(int x) { return x * 2; }", problem)
+    assert ok is True and score == 100 and fb == "Tests passed: 12/12"
+
+
+def _fake_jdk(monkeypatch, calls):
+    """Stand-in javac/java: javac "compiles" each source to an empty .class, java reports all passing"""
+    def fake_run(cmd, *args, **kwargs):
+        if cmd[0] == ce._PRLIMIT:
+            cmd = cmd[cmd.index('--') + 1:]
+        calls.append(cmd[0])
+        if cmd[0] == 'javac':
+            out_dir = cmd[cmd.index('-d') + 1]
+            for src in cmd:
+                if src.endswith('.java'):
+                    name = os.path.basename(src)[:-len('.java')]
+                    open(os.path.join(out_dir, name + '.class'), 'wb').close()
+            return ce.subprocess.CompletedProcess(cmd, 0, '', '')
+        return ce.subprocess.CompletedProcess(cmd, 0, '1/1 tests passed\n', '')
+    monkeypatch.setattr(ce.subprocess, 'run', fake_run)
+    monkeypatch.setattr(CodeEvaluator, '_resolve_java_tool', lambda self, tool: tool)
+    monkeypatch.setattr(CodeEvaluator, '_get_java_release', lambda self, java_cmd=None: '21')
+
+
+def test_java_regrade_skips_javac_when_classes_are_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(ce, '_JAVA_HARNESS_CACHE_DIR', str(tmp_path / 'harness'))
+    monkeypatch.setattr(ce, '_JAVA_SOLUTION_CACHE_DIR', str(tmp_path / 'solutions'))
+    calls = []
+    _fake_jdk(monkeypatch, calls)
+    evaluator = CodeEvaluator()
+    problem = ce.ProblemData(unit_tests="public static void main(String[] args) {\n    assert twice(2) == 4;\n}")
+    code = "public static int twice(int x) { return x * 2; }"
+
+    assert evaluator._evaluate_java(code, problem) == (True, 100, "Tests passed: 1/1")
+    assert calls == ['javac', 'java']
+    calls.clear()
+    assert evaluator._evaluate_java(code, problem) == (True, 100, "Tests passed: 1/1")
+    assert calls == ['java']
+
+    # Classes compiled for another release are never reused by a different JDK
+    monkeypatch.setattr(CodeEvaluator, '_get_java_release', lambda self, java_cmd=None: '17')
+    calls.clear()
+    assert evaluator._evaluate_java(code, problem) == (True, 100, "Tests passed: 1/1")
+    assert calls == ['javac', 'java']
+
+
+def test_concurrent_identical_java_submissions_share_one_javac(tmp_path, monkeypatch):
+    monkeypatch.setattr(ce, '_JAVA_HARNESS_CACHE_DIR', str(tmp_path / 'harness'))
+    monkeypatch.setattr(ce, '_JAVA_SOLUTION_CACHE_DIR', str(tmp_path / 'solutions'))
+    calls = []
+    _fake_jdk(monkeypatch, calls)
+    fake_run = ce.subprocess.run
+    monkeypatch.setattr(ce.subprocess, 'run', lambda cmd, *a, **k: (time.sleep(0.3) if 'javac' in cmd else None) or fake_run(cmd, *a, **k))
+    evaluator = CodeEvaluator()
+    problem = ce.ProblemData(unit_tests="public static void main(String[] args) {\n    assert twice(2) == 4;\n}")
+    code = "public static int twice(int x) { return x * 2; }"
+
+    with ThreadPoolExecutor(2) as pool:
+        results = list(pool.map(lambda _: evaluator._evaluate_java(code, problem), range(2)))
+    assert results == [(True, 100, "Tests passed: 1/1")] * 2
+    assert calls.count('javac') == 1
+
+
+def test_java_batch_applies_the_language_prefilter(monkeypatch):
+    calls = []
+    _fake_jdk(monkeypatch, calls)
+    evaluator = CodeEvaluator()
+    problem = ce.ProblemData(unit_tests="public static void main(String[] args) {\n    assert twice(2) == 4;\n}")
+    java_code = "public static int twice(int x) { return x * 2; }"
+    python_code = "def twice(x):\n    return x * 2\n"
+
+    results = evaluator._evaluate_java_batch([java_code, python_code, java_code + "\n"], problem)
+    assert results[1] == (False, 0, evaluator._detect_language_mismatch(python_code, 'java'))
+    assert results[0] == results[2] == (True, 100, "Tests passed: 1/1")
+    assert results[1][2] and calls.count('javac') == 1
+
+
+@pytest.mark.skipif(shutil.which('dotnet') is None, reason='dotnet not installed')
+def test_csharp_builds_with_csc_without_msbuild(monkeypatch):
+    evaluator = CodeEvaluator()
+    if evaluator._get_csharp_compiler() is None:
+        pytest.skip('csc.dll not found')
+    commands = []
+    real_run = ce.subprocess.run
+    monkeypatch.setattr(ce.subprocess, 'run', lambda cmd, *a, **k: commands.append(cmd) or real_run(cmd, *a, **k))
+
+    problem = evaluator._custom_problem_data("assert IsEven(2) == true;\nassert IsEven(3) == true;", 'c#')
+    ok, score, fb = evaluator._evaluate_csharp(
+        "public class S { public static bool IsEven(int n) { return n % 2 == 0; } }", problem
+    )
+    assert fb.startswith("Tests passed: 1/2")
+    assert not any('run' in cmd for cmd in commands)
+    # The compile goes through Roslyn's shared compiler server
+    assert any('-shared' in cmd for cmd in commands)
+
+
+@pytest.mark.skipif(shutil.which('dotnet') is None, reason='dotnet not installed')
+def test_csharp_method_scan_skips_comments_constructors_and_statements():
+    evaluator = CodeEvaluator()
+    if evaluator._get_csharp_compiler() is None:
+        pytest.skip('dotnet SDK not found')
+    code = (
+        "// class Fake { static int Bogus(int x) }\n"
+        "public class S {\n"
+        "    public S() { }\n"
+        "    public int Twice(int x) { if (x < 0) { return Helper(x); } return x * 2; }\n"
+        "    private static int Helper(int x) => x * 2;\n"
+        "}\n"
+    )
+    problem = evaluator._custom_problem_data("assert Double(2) == 4;\nassert Double(3) == 6;", 'c#')
+    assert evaluator._evaluate_csharp(code, problem) == (True, 100, "Tests passed: 2/2")
+
+
+@pytest.mark.skipif(shutil.which('dotnet') is None, reason='dotnet not installed')
+def test_csharp_fallback_restores_project_once(monkeypatch):
+    evaluator = CodeEvaluator()
+    if evaluator._get_csharp_compiler() is None:
+        pytest.skip('dotnet SDK not found')
+    monkeypatch.setattr(ce, '_dotnet_reference_pack', lambda root: None)
+    monkeypatch.setattr(ce, '_CSHARP_PROJECTS', {})
+    commands = []
+    real_run = ce.subprocess.run
+    monkeypatch.setattr(ce.subprocess, 'run', lambda cmd, *a, **k: commands.append(cmd[1]) or real_run(cmd, *a, **k))
+
+    problem = evaluator._custom_problem_data("assert IsEven(2) == true;", 'c#')
+    for body in ("return n % 2 == 0;", "return n % 2 == 1;"):
+        evaluator._evaluate_csharp("public class S { public static bool IsEven(int n) { %s } }" % body, problem)
+    assert commands.count('restore') == 1 and 'run' not in commands
+
+
+def test_scratch_dirs_are_emptied_and_reused(monkeypatch):
+    monkeypatch.setattr(ce, '_SCRATCH_POOL', ce.queue.SimpleQueue())
+    first = ce._acquire_scratch_dir('t_')
+    os.makedirs(os.path.join(first, 'obj'))
+    open(os.path.join(first, 'Main.java'), 'w').close()
+    ce._release_scratch_dir(first)
+    ce._CLEANUP_QUEUE.join()
+
+    second = ce._acquire_scratch_dir('t_')
+    assert second == first and os.listdir(second) == []
+    ce._release_scratch_dir(second)
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason='POSIX ownership checks')
+def test_scratch_root_in_shared_tmpfs_must_be_private(tmp_path, monkeypatch):
+    monkeypatch.setattr(ce, '_SCRATCH_BASE', str(tmp_path))
+    monkeypatch.setattr(ce, '_SCRATCH_POOL', ce.queue.SimpleQueue())
+    elsewhere = tmp_path / 'elsewhere'
+    elsewhere.mkdir()
+    os.symlink(elsewhere, ce._scratch_root())
+    with pytest.raises(PermissionError):
+        ce._acquire_scratch_dir('t_')
+    assert os.listdir(elsewhere) == []
+
+
+def test_java_method_extraction_ignores_braces_in_literals_and_comments():
+    code = (
+        "public class Main {\n"
+        "    public static int depth(String s) {\n"
+        "        // a stray } in a comment\n"
+        "        if (s.equals(\"}\")) { return '{'; }\n"
+        "        return 0;\n"
+        "    }\n"
+        "    public static void main(String[] args) { System.out.println(depth(\"x\")); }\n"
+        "}\n"
+    )
+    tests = "public static void main(String[] args) {\n    assert depth(\"}\") == 123;\n}"
+    _, solution_source, _, _ = CodeEvaluator()._parse_java_submission(code, tests)
+    assert "main" not in solution_source
+    assert solution_source.endswith("    return 0;\n    }\n\n}\n")
+
+
+def test_java_private_methods_are_callable_from_the_harness():
+    evaluator = CodeEvaluator()
+    tests = "assert twice(2) == 4;"
+    code = (
+        "public class Main {\n"
+        "    private static int twice(int n) {\n"
+        "        return n * 2;\n"
+        "    }\n"
+        "}\n"
+    )
+    _, solution_source, _, _ = evaluator._parse_java_submission(code, tests)
+    assert "    static int twice(int n) {\n" in solution_source and "private" not in solution_source
+
+    for modifiers in ("private static", "protected static", "static", "public static"):
+        _, solution_source, _, _ = evaluator._parse_java_submission(
+            f"{modifiers} int twice(int n) {{ return n * 2; }}", tests)
+        assert solution_source == "public class Solution {\n    public static int twice(int n) { return n * 2; }\n}\n"
+
+
+def test_java_and_csharp_reject_other_languages_before_compiling(monkeypatch):
+    evaluator = CodeEvaluator()
+    monkeypatch.setattr(ce.subprocess, 'run', lambda *a, **k: pytest.fail('compiler should not run'))
+    problem = evaluator._custom_problem_data("assert isEven(2) == true;", 'java')
+
+    ok, score, fb = evaluator._evaluate_java("def isEven(n):\n    return n % 2 == 0", problem)
+    assert (ok, score) == (False, 0) and 'does not look like Java' in fb
+    ok, score, fb = evaluator._evaluate_csharp("import java.util.*;\npublic class Main {}", problem)
+    assert (ok, score) == (False, 0) and 'does not look like C#' in fb
+
+
+@pytest.mark.parametrize('language, code', [
+    ('java', "long factorial(long n){ return n <= 1 ? 1 : n * factorial(n - 1); }"),
+    ('java', "boolean isEven(long n){ return n % 2 == 0; }"),
+    ('java', "double average(double[] a){ double s = 0; for (double x : a) s += x; return s / a.length; }"),
+    ('java', "/* like std::sort */\nlong total(long[] a){ return 0; }"),
+    ('java', 'String greet(){ return "def hello(): console.log(1)"; }'),
+    ('c#', "bool IsEven(long n) => n % 2 == 0;"),
+    ('c#', "// port of System.out.println\ndouble Half(double x) => x / 2;"),
+])
+def test_bare_methods_and_foreign_text_in_comments_are_left_to_the_compiler(language, code):
+    assert ce._detect_language_mismatch(code, language) is None
+
+
+def test_java_bare_method_without_static_is_called_by_name():
+    tests = "public static void main(String[] args) {\n    assert factorial(5) == 120;\n}"
+    method_name, solution_source, _, asserts = CodeEvaluator()._parse_java_submission(
+        "long factorial(long n){ return n <= 1 ? 1 : n * factorial(n - 1); }", tests)
+    assert method_name == 'factorial'
+    assert solution_source.startswith("public class Solution {\n    public static long factorial(long n){")
+    assert asserts == ["Solution.factorial(5) == 120"]
+
+
+@pytest.mark.skipif(shutil.which('dotnet') is None, reason='dotnet not installed')
+def test_csharp_bare_method_is_wrapped_in_a_class():
+    evaluator = CodeEvaluator()
+    if evaluator._get_csharp_compiler() is None:
+        pytest.skip('csc.dll not found')
+    problem = evaluator._custom_problem_data("assert IsEven(2) == true;\nassert IsEven(3) == false;", 'c#')
+    assert evaluator._evaluate_csharp("bool IsEven(long n) => n % 2 == 0;", problem) == (True, 100, "Tests passed: 2/2")
+
+
+def test_java_tool_lookup_is_memoized(monkeypatch):
+    lookups = []
+    monkeypatch.setattr(ce.shutil, 'which', lambda name: lookups.append(name) or f'/opt/jdk/bin/{name}')
+    CodeEvaluator.clear_tool_cache()
+    try:
+        evaluator = CodeEvaluator()
+        assert evaluator._resolve_java_tool('javac') == '/opt/jdk/bin/javac'
+        assert CodeEvaluator()._resolve_java_tool('javac') == '/opt/jdk/bin/javac'
+        assert lookups == ['javac']
+        CodeEvaluator.clear_tool_cache()
+        evaluator._resolve_java_tool('javac')
+        assert lookups == ['javac', 'javac']
+    finally:
+        CodeEvaluator.clear_tool_cache()
+
+
+def test_java_tool_found_under_newest_jdk_in_java_home(monkeypatch, tmp_path):
+    for jdk in ('jdk-17', 'jdk-21'):
+        (tmp_path / jdk / 'bin').mkdir(parents=True)
+        (tmp_path / jdk / 'bin' / 'javac').write_text('')
+        (tmp_path / jdk / 'bin' / 'javac').chmod(0o755)
+    (tmp_path / 'README').write_text('')
+    # Nothing on PATH; only the JAVA_HOME search may find it
+    real_which = shutil.which
+    monkeypatch.setattr(ce.shutil, 'which', lambda name, path=None: real_which(name, path=path) if path else None)
+    monkeypatch.setenv('JAVA_HOME', str(tmp_path))
+    monkeypatch.delenv('JDK_HOME', raising=False)
+    CodeEvaluator.clear_tool_cache()
+    try:
+        assert ce._resolve_java_tool('javac') == str(tmp_path / 'jdk-21' / 'bin' / 'javac')
+    finally:
+        CodeEvaluator.clear_tool_cache()
+
+
+def test_java_release_read_from_jdk_release_file(monkeypatch, tmp_path):
+    (tmp_path / 'bin').mkdir()
+    (tmp_path / 'bin' / 'java').write_text('')
+    (tmp_path / 'release').write_text('IMPLEMENTOR="Eclipse Adoptium"\nJAVA_VERSION="17.0.9"\n')
+    monkeypatch.setattr(ce.subprocess, 'run', lambda *a, **k: pytest.fail('java -version was spawned'))
+    CodeEvaluator.clear_tool_cache()
+    try:
+        assert CodeEvaluator()._get_java_release(str(tmp_path / 'bin' / 'java')) == '17'
+    finally:
+        CodeEvaluator.clear_tool_cache()
+
+
+def test_hung_java_version_probe_falls_back_once(monkeypatch, tmp_path):
+    probes = []
+    def hang(cmd, **kwargs):
+        probes.append(kwargs['timeout'])
+        raise ce.subprocess.TimeoutExpired(cmd, kwargs['timeout'])
+    monkeypatch.setattr(ce.subprocess, 'run', hang)
+    CodeEvaluator.clear_tool_cache()
+    try:
+        java = str(tmp_path / 'bin' / 'java')
+        assert CodeEvaluator()._get_java_release(java) == '21'
+        assert CodeEvaluator()._get_java_release(java) == '21'
+        assert probes == [ce._JAVA_PROBE_TIMEOUT]
+    finally:
+        CodeEvaluator.clear_tool_cache()
+
+
+def test_csc_search_gives_up_on_unresponsive_network_share(monkeypatch):
+    share_answered = threading.Event()
+    real_scan = ce._sdk_csc_dlls
+    monkeypatch.setattr(ce, '_sdk_csc_dlls', lambda root: (share_answered.wait(5) and []) if root.startswith('\\\\') else real_scan(root))
+    monkeypatch.setattr(ce, '_UNC_PROBE_TIMEOUT', 0.1)
+    monkeypatch.setenv('DOTNET_ROOT', r'\\fileserver\dotnet')
+    monkeypatch.delenv('PROGRAMFILES', raising=False)
+    monkeypatch.delenv('PROGRAMFILES(X86)', raising=False)
+    CodeEvaluator.clear_tool_cache()
+    try:
+        started = time.monotonic()
+        assert ce._find_csc_dll() is None
+        assert time.monotonic() - started < 2
+    finally:
+        share_answered.set()
+        CodeEvaluator.clear_tool_cache()
@@ -1,3 +1,4 @@
+import os
 import pytest
 from app import db
 from app.models.models import Form, Question, Response, Answer
@@ -47,4 +48,106 @@ def test_cascade_delete_form_removes_children(app):
         # Responses are not automatically cascaded when a form is deleted
         assert Response.query.count() == 1
         # Answers tied to deleted questions should be removed
-        assert Answer.query.count() == 0 
\ No newline at end of file
+        assert Answer.query.count() == 0 
+
+def test_question_json_cache_follows_column_changes(app):
+    with app.app_context():
+        q = Question(form_id=1, question_text='Q', question_type='checkbox', correct_answer='["A"]')
+        q.set_options(['A', 'B'])
+        first = q.get_options()
+        first.append('mutated')
+        assert q.get_options() == ['A', 'B']
+        q.set_options(['C'])
+        q.correct_answer = '["C"]'
+        assert q.get_options() == ['C']
+        assert q.get_correct_answers() == ['C']
+
+
+def test_dataset_columns_cache_follows_column_changes(app):
+    from app.models.models import Dataset
+    with app.app_context():
+        ds = Dataset(name='D', filename='d.csv', file_path='d.csv', file_size=0)
+        ds.set_columns(['question', 'answer'])
+        ds.get_columns().append('mutated')
+        assert ds.get_columns() == ['question', 'answer']
+        ds.columns = '["topic"]'
+        assert ds.get_columns() == ['topic']
+
+
+def test_question_content_columns_are_deferred(app):
+    from sqlalchemy import inspect
+    from sqlalchemy.orm import undefer_group
+    with app.app_context():
+        f = Form(title='F')
+        db.session.add(f)
+        db.session.flush()
+        q = Question(form_id=f.id, question_text='Q', question_type='coding', sample_code='print(1)', expected_output='1')
+        db.session.add(q)
+        db.session.commit()
+        form_id = f.id
+        db.session.expunge_all()
+        q = Question.query.filter_by(form_id=form_id).one()
+        assert {'options', 'sample_code', 'expected_output', 'correct_answer'} <= inspect(q).unloaded
+        assert q.sample_code == 'print(1)'
+        db.session.expunge_all()
+        q = Question.query.options(undefer_group('content')).filter_by(form_id=form_id).one()
+        assert 'expected_output' not in inspect(q).unloaded
+        assert q.expected_output == '1'
+
+
+def test_response_answers_load_in_one_query(app):
+    from sqlalchemy import event
+    from sqlalchemy.orm import selectinload
+    with app.app_context():
+        f = Form(title='F')
+        db.session.add(f)
+        db.session.flush()
+        q = Question(form_id=f.id, question_text='Q', question_type='identification')
+        db.session.add(q)
+        db.session.flush()
+        for _ in range(3):
+            r = Response(form_id=f.id)
+            db.session.add(r)
+            db.session.flush()
+            db.session.add(Answer(response_id=r.id, question_id=q.id, score_percentage=50))
+        db.session.commit()
+        form_id = f.id
+        db.session.expunge_all()
+
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            # An existence check does not touch the answers table
+            assert Response.query.filter_by(form_id=form_id).first() is not None
+            assert len(statements) == 1
+            db.session.expunge_all()
+
+            responses = Response.query.options(selectinload(Response.answers)).filter_by(form_id=form_id).all()
+            assert [len(r.answers) for r in responses] == [1, 1, 1]
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        assert len(statements) == 3
+
+
+def test_dataset_sample_reads_only_preview_rows_and_tracks_edits(tmp_path):
+    from app.models.models import Dataset
+    path = tmp_path / 'it_olympics_coding.csv'
+    path.write_text('a,b\n' + ''.join(f'{i},{i * 2}\n' for i in range(100)))
+    ds = Dataset(name='D', filename='it_olympics_coding.csv', file_path=str(path), file_size=0)
+    assert ds.get_sample_data(3) == [{'a': 0, 'b': 0}, {'a': 1, 'b': 2}, {'a': 2, 'b': 4}]
+
+    path.write_text('a,b\n7,8\n')
+    os.utime(path, (1, 1))
+    assert ds.get_sample_data(3) == [{'a': 7, 'b': 8}]
+
+    # An edit that keeps the old mtime is still noticed through the size...
+    path.write_text('a,b\n70,80\n')
+    os.utime(path, (1, 1))
+    assert ds.get_sample_data(3) == [{'a': 70, 'b': 80}]
+    # ...and a same-size file swapped in with the same mtime through the inode
+    replacement = tmp_path / 'replacement.csv'
+    replacement.write_text('a,b\n71,81\n')
+    os.utime(replacement, (1, 1))
+    os.replace(replacement, path)
+    assert ds.get_sample_data(3) == [{'a': 71, 'b': 81}]
@@ -2,6 +2,7 @@ import os
 import io
 import csv
 import pytest
+import pandas as pd
 from unittest.mock import patch
 
 from app.models import users as users_mod
@@ -60,6 +61,20 @@ def test_authenticate_user_via_users_csv(tmp_path):
     assert authenticate_user('bob', 'wrong') is None
 
 
+def test_users_file_parsed_once_until_it_changes(tmp_path):
+    initialize_users_file()
+    register_user('carol', 'pw', 'student')
+    rows = users_mod._load_users()
+    assert get_user('carol') is not None and users_mod._load_users() is rows
+    # Appends and whole-file rewrites are both picked up
+    register_user('dave', 'pw', 'student')
+    assert get_user('dave') is not None
+    with open(users_mod.USERS_FILE, 'w', newline='') as f:
+        csv.writer(f).writerows([['username', 'password_hash', 'role'], ['erin', hash_password('pw'), 'student']])
+    assert get_user('carol') is None
+    assert authenticate_user('erin', 'pw').username == 'erin'
+
+
 def _create_section_csv(section_name, rows):
     # Helper to write a section CSV and register in sections file
     initialize_sections_file()
@@ -85,6 +100,28 @@ def test_get_sections_and_students(tmp_path):
     assert any(s.student_id == '1' for s in students)
 
 
+def test_sections_and_students_reused_until_files_change(tmp_path):
+    _create_section_csv('S1', [['1','A','No','a@example.com','11']])
+    first = get_section('S1')
+    assert get_section('S1') is first
+    assert first.students[0] is get_all_students()[0]
+    # Appending a student and adding a section are both seen on the next read
+    add_single_student('2', 'B', True, 'b@example.com', '11', 'S1')
+    assert [s.student_id for s in get_section('S1').students] == ['1', '2']
+    delete_section('S1')
+    assert get_section('S1') is None
+
+
+def test_student_index_rebuilt_only_after_student_files_change(tmp_path):
+    _create_section_csv('S1', [['1','A','No','a@example.com','11']])
+    index = users_mod._student_index()
+    assert student_id_exists('1') and not student_id_exists('2')
+    assert users_mod._student_index() is index
+    add_single_student('2', 'B', True, 'b@example.com', '11', 'S1')
+    assert student_id_exists('2')
+    assert users_mod.get_student_by_id('2').section == 'S1'
+
+
 def test_student_id_exists(tmp_path):
     _create_section_csv('S1', [['1','A','No','a@example.com','11']])
     assert student_id_exists('1') is True
@@ -125,6 +162,90 @@ def test_save_section_from_excel_happy_and_duplicates(tmp_path, monkeypatch):
     assert ok2 is False and 'Duplicate student IDs' in msg2
 
 
+def _save_isregular_section(monkeypatch, section, values):
+    """Upload a fake Excel sheet with the given isregular cells and return the stored is_irregular values"""
+    monkeypatch.setattr(pd, 'read_excel', lambda p: pd.DataFrame({
+        'studentid': [str(i) for i in range(20, 20 + len(values))],
+        'name': ['N'] * len(values),
+        'email': [''] * len(values),
+        'isregular': values,
+        'gradelevel': ['12'] * len(values),
+    }))
+    class Dummy:
+        def save(self, p):
+            open(p, 'wb').close()
+    ok, msg = save_section_from_excel(section, Dummy())
+    assert ok is True
+    return [s.is_irregular for s in get_section(section).students]
+
+
+def _per_row_is_irregular(values):
+    """The original cell-by-cell isregular -> is_irregular conversion the column version must match"""
+    is_irregular = []
+    for val in values:
+        if isinstance(val, bool):
+            is_irregular.append("No" if val else "Yes")
+        elif isinstance(val, (int, float)):
+            is_irregular.append("No" if val else "Yes")
+        elif isinstance(val, str):
+            is_irregular.append("No" if val.lower() in ['true', 'yes', '1', 'regular'] else "Yes")
+        else:
+            is_irregular.append("Yes")
+    return is_irregular
+
+
+def test_save_section_from_excel_maps_isregular_to_is_irregular(tmp_path, monkeypatch):
+    values = ['Yes', 'no', 'REGULAR', None, 1, 0.0, True]
+    assert _save_isregular_section(monkeypatch, 'Mixed', values) == ['No', 'Yes', 'No', 'Yes', 'No', 'Yes', 'No']
+
+
+@pytest.mark.parametrize('values', [
+    [True, False, None, True],  # boolean
+    ['Yes', 'no', 'REGULAR', 'true', '1', ' yes', '', None, float('nan')],  # string
+    [1, 0, 2, -1],  # integer
+    [1.0, 0.0, float('nan'), 0.5],  # floating
+    pd.Series([1, 0.0, 2.5, 0], dtype=object),  # mixed-integer-float
+])
+def test_isregular_column_conversion_matches_per_row_rule(tmp_path, monkeypatch, values):
+    column = pd.DataFrame({'isregular': values})['isregular']
+    # Compare against what the old loop saw: the cells as they come out of the DataFrame
+    assert _save_isregular_section(monkeypatch, 'Typed', values) == _per_row_is_irregular(list(column))
+
+
+@pytest.mark.parametrize('grade_level', [[12, float('nan'), 11.5], [True, False, True]])
+def test_save_section_from_excel_csv_matches_dataframe_to_csv(tmp_path, monkeypatch, grade_level):
+    sheet = pd.DataFrame({
+        'studentid': ['101', '102', '103'],
+        'name': ['Doe, Jane', 'Quote "Q" Person', None],
+        'email': ['a@example.com', '', float('nan')],
+        'isregular': [True, False, True],
+        'gradelevel': grade_level,
+    })
+    monkeypatch.setattr(pd, 'read_excel', lambda p: sheet)
+    class Dummy:
+        def save(self, p):
+            open(p, 'wb').close()
+    ok, msg = save_section_from_excel('RoundTrip', Dummy())
+    assert ok is True
+
+    # What the old code wrote: the extracted columns as a DataFrame saved with to_csv
+    expected = pd.DataFrame({
+        'student_id': sheet['studentid'],
+        'fullname': sheet['name'],
+        'is_irregular': ['No', 'Yes', 'No'],
+        'email': sheet['email'],
+        'grade_level': sheet['gradelevel'],
+    }).to_csv(index=False)
+    [written] = [name for name in os.listdir(users_mod.STUDENTS_DIR) if name.endswith('.csv')]
+    with open(os.path.join(users_mod.STUDENTS_DIR, written), newline='') as f:
+        assert f.read().replace('\r\n', '\n') == expected
+
+    # Reading the section back gives the same students the old file did
+    fields = ('student_id', 'fullname', 'is_irregular', 'email', 'grade_level')
+    old_rows = [tuple(row[f] for f in fields) for row in csv.DictReader(io.StringIO(expected))]
+    assert [tuple(getattr(s, f) for f in fields) for s in get_section('RoundTrip').students] == old_rows
+
+
 def test_register_students_from_section_and_authenticate(tmp_path):
     _create_section_csv('S1', [['7','Stud','No','s@example.com','12']])
     # auth should auto-register student if not present